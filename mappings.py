@@ -0,0 +1,165 @@
+# mappings.py
+import re
+from functools import lru_cache
+from pathlib import Path
+
+
+MAPPING_FILE = "device_mappings.txt"
+
+# path -> (mtime_ns, size, mapping); lets periodic reloads skip unchanged files.
+# A missing file is cached as (-1, -1, {}) so it is only reported once.
+_MAPPING_CACHE: dict[str, tuple[int, int, dict]] = {}
+
+# One match per non-blank, non-comment line. [^\S\n] is any whitespace
+# except a newline, so the groups come out trimmed as str.strip() would:
+# group 1 = identifier (may be empty), group 2 = name (None if no '=')
+_LINE_RE = re.compile(
+    r"(?m)^[^\S\n]*(?=[^#\s])([^=\n]*?)[^\S\n]*(?:=[^\S\n]*(.*?))?[^\S\n]*$"
+)
+
+
+@lru_cache(maxsize=2048)
+def normalise_key(identifier: str) -> str:
+    """Normalise an address or device name for case-insensitive matching."""
+    return identifier.strip().upper()
+
+
+def load_device_mappings(
+    path: str = MAPPING_FILE, messages: list[str] | None = None
+) -> dict:
+    """
+    Load mappings of IDENTIFIER -> friendly name.
+
+    IDENTIFIER can be:
+      - a BLE address / UUID
+      - a BLE device name (e.g. 'iPhone iWill')
+    Matching is done case-insensitively on the identifier.
+
+    The parsed result is cached per path and only re-read when the file's
+    mtime or size changes, so calling this every few seconds is cheap.
+    Missing-file / malformed-line messages are only produced when the file
+    is actually (re)read. They are printed, or appended to `messages`
+    instead if a list is given.
+    """
+    mapping = {}
+    p = Path(path)
+    report = print if messages is None else messages.append
+    cached = _MAPPING_CACHE.get(path)
+
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        if cached and cached[1] == -1:
+            return cached[2]
+        _MAPPING_CACHE[path] = (-1, -1, mapping)
+        report(f"[INFO] Mapping file {path} does not exist yet.")
+        return mapping
+
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    text = p.read_text(encoding="utf-8")
+    for m in _LINE_RE.finditer(text):
+        identifier, name = m.groups()
+        if name is None or not identifier:
+            line = m.group().strip()
+            report(f"[WARN] Ignoring malformed line in {path!r}: {line}")
+            continue
+        mapping[normalise_key(identifier)] = name
+
+    _MAPPING_CACHE[path] = (st.st_mtime_ns, st.st_size, mapping)
+    return mapping
+
+
+def _last_line(p: Path) -> bytes:
+    """Return the final line of a file (with its line ending, if any)."""
+    with p.open("rb") as f:
+        pos = f.seek(0, 2)
+        tail = b""
+        while pos > 0:
+            step = min(1024, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            # A line break before the final line's own ending marks its start
+            cut = tail.rfind(b"\n", 0, len(tail) - 1)
+            if cut != -1:
+                return tail[cut + 1:]
+        return tail
+
+
+def upsert_device_mapping(
+    address: str, name: str, path: str = MAPPING_FILE
+) -> None:
+    address = normalise_key(address)
+    name = name.strip()
+
+    p = Path(path)
+
+    if not p.exists():
+        # Create new file with a header comment
+        lines = [
+            "# Device mappings: ADDRESS = Friendly Name",
+            "# Lines starting with # are comments.",
+            "",
+            f"{address} = {name}",
+            "",
+        ]
+        p.write_text("\n".join(lines), encoding="utf-8")
+        print(f"[INFO] Created {path} and added {address} -> {name}")
+        return
+
+    # Diagnostics are discarded; the CLI only reports what it changes
+    if address not in load_device_mappings(path, messages=[]):
+        # New address: append one line instead of rewriting the file,
+        # ensuring a newline and an empty line before it, if needed
+        last = _last_line(p).decode("utf-8")
+        sep = ""
+        if last and not last.endswith("\n"):
+            sep += "\n"
+        if last.strip():
+            sep += "\n"
+        with p.open("a", encoding="utf-8") as f:
+            f.write(f"{sep}{address} = {name}\n")
+        print(f"[INFO] Added mapping: {address} -> {name} in {path}")
+        return
+
+    # Read existing lines
+    with p.open("r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    updated = False
+    new_lines = []
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Keep comments / empty lines
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            new_lines.append(line)
+            continue
+
+        existing_addr, existing_name = stripped.split("=", 1)
+        existing_addr = normalise_key(existing_addr)
+
+        if existing_addr == address:
+            # Replace this line with updated mapping
+            new_line = f"{address} = {name}\n"
+            new_lines.append(new_line)
+            updated = True
+        else:
+            new_lines.append(line)
+
+    if not updated:
+        # Append at the end (ensure an empty line before, if needed)
+        if new_lines and not new_lines[-1].endswith("\n"):
+            new_lines[-1] = new_lines[-1] + "\n"
+        if new_lines and new_lines[-1].strip():
+            new_lines.append("\n")
+        new_lines.append(f"{address} = {name}\n")
+
+    with p.open("w", encoding="utf-8") as f:
+        f.writelines(new_lines)
+
+    action = "Updated" if updated else "Added"
+    print(f"[INFO] {action} mapping: {address} -> {name} in {path}")
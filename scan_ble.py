@@ -1,84 +1,109 @@
 # scan_ble.py
 import asyncio
+import heapq
+import sys
 import time
-from pathlib import Path
+from operator import attrgetter
 from dataclasses import dataclass, field
 
 from bleak import BleakScanner
 
+from mappings import MAPPING_FILE, load_device_mappings, normalise_key
+
 
-MAPPING_FILE = "device_mappings.txt"
 PRINT_INTERVAL = 5      # how often to print the table (seconds)
 RELOAD_INTERVAL = 5     # how often to reload mappings (seconds)
 STALE_AFTER = 30        # hide devices not seen for this many seconds
 
+# Pre-bound row formatters for print_table (format spec parsed once)
+_KNOWN_ROW = "{:<20} {:<6} {:<20} {:<20}".format
+_UNKNOWN_ROW = "{:<6} {:<20} {:<20}".format
 
-def load_device_mappings(path: str = MAPPING_FILE) -> dict:
-    """
-    Load mappings of IDENTIFIER -> friendly name.
-
-    IDENTIFIER can be:
-      - a BLE address / UUID
-      - a BLE device name (e.g. 'iPhone iWill')
-    Matching is done case-insensitively on the identifier.
-    """
-    mapping = {}
-    p = Path(path)
-
-    if not p.exists():
-        print(f"[INFO] Mapping file {path} does not exist yet.")
-        return mapping
-
-    with p.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            if "=" not in line:
-                print(f"[WARN] Ignoring malformed line in {path!r}: {line}")
-                continue
-
-            identifier, name = line.split("=", 1)
-            key = identifier.strip().upper()
-            mapping[key] = name.strip()
-
-    return mapping
+# Cursor home + clear screen, so each table redraws in place on a terminal
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
 
 
-@dataclass
+@dataclass(slots=True)
 class SeenDevice:
     addr: str
     name: str
     rssi: int | None = None
-    last_seen: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.monotonic)
+    friendly: str | None = None
+    # Normalised mapping keys, refreshed only when addr/name change
+    addr_key: str = ""
+    name_key: str = ""
+    rssi_sort: int = -999  # rssi with None mapped to -999, for sorting
 
 
 class DeviceTracker:
     def __init__(self, mapping_path: str = MAPPING_FILE):
         self.mapping_path = mapping_path
-        self.mapping = load_device_mappings(mapping_path)
-        self.last_reload = time.time()
+        messages: list[str] = []
+        self.mapping = load_device_mappings(mapping_path, messages)
+        self.last_reload = time.monotonic()
         self.devices: dict[str, SeenDevice] = {}
-
-        print("[INFO] Initial mappings:")
+        # Min-heap with one (last_seen, key) entry per device; the timestamp
+        # may be out of date and is only refreshed when the entry is popped
+        self._expiry: list[tuple[float, str]] = []
+        # Device keys partitioned by whether they have a friendly name.
+        # dicts (values unused) keep first-seen order, so RSSI ties sort stably
+        self._known_keys: dict[str, None] = {}
+        self._unknown_keys: dict[str, None] = {}
+        # Set whenever the printed table would change; cleared after printing
+        self._dirty = True
+        # Only redraw in place on a terminal; logs/pipes get plain output
+        self._clear = _CLEAR_SCREEN if sys.stdout.isatty() else ""
+        # Status lines waiting to be shown above the next redrawn table
+        self._notices: list[str] = []
+
+        notice = [*messages, "[INFO] Initial mappings:"]
         if self.mapping:
-            for ident, name in self.mapping.items():
-                print(f"  {ident} -> {name}")
+            notice += [f"  {ident} -> {name}" for ident, name in self.mapping.items()]
         else:
-            print("  (none yet)")
-        print()
+            notice.append("  (none yet)")
+        notice.append("")
+        self.announce(*notice)
+
+    def announce(self, *lines: str):
+        """
+        Show status lines to the user.
+
+        On a terminal they are held and drawn above the next table, since
+        the redraw would otherwise clear them straight away.
+        """
+        if self._clear:
+            self._notices.extend(lines)
+            self._dirty = True
+        else:
+            print("\n".join(lines))
 
     def maybe_reload_mapping(self):
-        now = time.time()
+        now = time.monotonic()
         if now - self.last_reload >= RELOAD_INTERVAL:
-            new_map = load_device_mappings(self.mapping_path)
-            if new_map != self.mapping:
-                print("\n[INFO] Device mappings updated:")
-                for ident, name in new_map.items():
-                    print(f"  {ident} -> {name}")
-                print()
+            messages: list[str] = []
+            new_map = load_device_mappings(self.mapping_path, messages)
+            # An unchanged file returns the very same cached dict, so the
+            # full comparison only runs after the file has been touched
+            if new_map is not self.mapping:
+                if messages:
+                    self.announce(*messages)
+                changed = new_map != self.mapping
                 self.mapping = new_map
+                if changed:
+                    self.announce(
+                        "",
+                        "[INFO] Device mappings updated:",
+                        *(f"  {ident} -> {name}" for ident, name in new_map.items()),
+                        "",
+                    )
+                    # Rebuild both buckets in self.devices (first-seen) order
+                    self._known_keys.clear()
+                    self._unknown_keys.clear()
+                    for key, dev in self.devices.items():
+                        dev.friendly = self._friendly_name(dev)
+                        self._bucket(key, dev)
+                    self._dirty = True
             self.last_reload = now
 
     def detection_callback(self, device, advertisement_data):
@@ -88,31 +113,67 @@ class DeviceTracker:
         rssi = advertisement_data.rssi  # <- this is the good bit on macOS
 
         key = addr or name  # use address if present, else name
-        now = time.time()
+        now = time.monotonic()
 
         existing = self.devices.get(key)
-        if existing:
-            existing.rssi = rssi
-            existing.name = name
+        if existing and existing.name == name:
+            # Repeat advertisement: keys and friendly name are unchanged
+            if existing.rssi != rssi:
+                existing.rssi = rssi
+                existing.rssi_sort = rssi if rssi is not None else -999
+                self._dirty = True
             existing.last_seen = now
         else:
-            self.devices[key] = SeenDevice(addr=addr, name=name, rssi=rssi, last_seen=now)
+            self._dirty = True
+            if existing:
+                existing.rssi = rssi
+                existing.name = name
+                existing.last_seen = now
+            else:
+                existing = self.devices[key] = SeenDevice(
+                    addr=addr, name=name, rssi=rssi, last_seen=now
+                )
+                heapq.heappush(self._expiry, (now, key))
+            existing.addr_key = normalise_key(addr)
+            existing.name_key = normalise_key(name)
+            # Resolve once here so printing doesn't redo the lookup every cycle
+            existing.friendly = self._friendly_name(existing)
+            self._bucket(key, existing)
+            existing.rssi_sort = rssi if rssi is not None else -999
+
+    def _drop_stale(self, now: float):
+        cutoff = now - STALE_AFTER
+        while self._expiry and self._expiry[0][0] < cutoff:
+            ts, key = heapq.heappop(self._expiry)
+            dev = self.devices.get(key)
+            if dev is None:
+                continue
+            if dev.last_seen > ts:
+                # Seen again since this entry was queued; requeue with the
+                # latest sighting instead of evicting
+                heapq.heappush(self._expiry, (dev.last_seen, key))
+                continue
+            del self.devices[key]
+            self._known_keys.pop(key, None)
+            self._unknown_keys.pop(key, None)
+            self._dirty = True
+
+    def _bucket(self, key: str, dev: SeenDevice):
+        if dev.friendly:
+            self._known_keys[key] = None
+            self._unknown_keys.pop(key, None)
+        else:
+            self._unknown_keys[key] = None
+            self._known_keys.pop(key, None)
 
     def _friendly_name(self, dev: SeenDevice) -> str | None:
         # Match by address OR by name (case-insensitive)
-        addr_key = (dev.addr or "").upper()
-        name_key = dev.name.strip().upper() if dev.name else ""
-
-        return self.mapping.get(addr_key) or self.mapping.get(name_key)
+        return self.mapping.get(dev.addr_key) or self.mapping.get(dev.name_key)
 
     def print_OLD_table(self):
-        now = time.time()
+        now = time.monotonic()
 
-        # Drop stale devices
-        self.devices = {
-            k: v for k, v in self.devices.items()
-            if now - v.last_seen <= STALE_AFTER
-        }
+        self._drop_stale(now)
 
         if not self.devices:
             print("[INFO] No recent devices.\n")
@@ -124,7 +185,7 @@ class DeviceTracker:
         print("-" * 80)
 
         for dev in self.devices.values():
-            friendly = self._friendly_name(dev)
+            friendly = dev.friendly
             known = "YES" if friendly else "NO"
             label = friendly or ""
             rssi_str = str(dev.rssi) if dev.rssi is not None else "N/A"
@@ -137,65 +198,75 @@ class DeviceTracker:
         print()
 
     def print_table(self):
-        now = time.time()
+        now = time.monotonic()
 
-        # Drop stale devices
-        self.devices = {
-            k: v for k, v in self.devices.items()
-            if now - v.last_seen <= STALE_AFTER
-        }
+        self._drop_stale(now)
 
-        if not self.devices:
-            print("[INFO] No recent devices.\n")
+        # Nothing new, changed or expired since the last table
+        if not self._dirty:
             return
+        self._dirty = False
 
-        print("[INFO] Recently seen devices (last ~30s):")
+        # Clear the screen (on a terminal) and show any pending notices
+        head = self._clear
+        if self._notices:
+            head += "\n".join(self._notices) + "\n"
+            self._notices.clear()
 
-        # -------- SORTING --------
-        # Split into known and unknown devices
-        known = []
-        unknown = []
+        if not self.devices:
+            sys.stdout.write(f"{head}[INFO] No recent devices.\n\n")
+            return
 
-        for dev in self.devices.values():
-            friendly = self._friendly_name(dev)
-            if friendly:
-                known.append((friendly, dev))
-            else:
-                unknown.append(dev)
+        # -------- SORTING --------
+        # Known/unknown split is maintained as devices are seen
+        devices = self.devices
+        by_rssi = attrgetter("rssi_sort")
 
         # Sort known devices by RSSI (higher is closer)
-        known.sort(key=lambda kv: (kv[1].rssi if kv[1].rssi is not None else -999), reverse=True)
+        known = sorted(
+            [devices[k] for k in self._known_keys], key=by_rssi, reverse=True
+        )
 
         # Sort unknown devices by RSSI too (optional)
-        unknown.sort(key=lambda d: (d.rssi if d.rssi is not None else -999), reverse=True)
+        unknown = sorted(
+            [devices[k] for k in self._unknown_keys], key=by_rssi, reverse=True
+        )
 
         # -------- PRINTING --------
-        print("-" * 80)
-        print("KNOWN DEVICES (closest first)")
-        print("-" * 80)
-        print(f"{'Friendly':<20} {'RSSI':<6} {'Name':<20} {'ID':<20}")
-        print("-" * 80)
-        for friendly, dev in known:
+        # Build the whole table and write it in one go
+        rule = "-" * 80
+        lines = ["[INFO] Recently seen devices (last ~30s):"]
+
+        lines += [
+            rule,
+            "KNOWN DEVICES (closest first)",
+            rule,
+            _KNOWN_ROW("Friendly", "RSSI", "Name", "ID"),
+            rule,
+        ]
+        for dev in known:
             rssi_str = str(dev.rssi) if dev.rssi is not None else "N/A"
-            print(f"{friendly:<20} {rssi_str:<6} {dev.name:<20} {dev.addr:<20}")
+            lines.append(_KNOWN_ROW(dev.friendly, rssi_str, dev.name, dev.addr))
         if not known:
-            print("(none)")
-        print()
-
-        print("-" * 80)
-        print("UNKNOWN DEVICES")
-        print("-" * 80)
-        print(f"{'RSSI':<6} {'Name':<20} {'ID':<20}")
-        print("-" * 80)
+            lines.append("(none)")
+        lines.append("")
+
+        lines += [
+            rule,
+            "UNKNOWN DEVICES",
+            rule,
+            _UNKNOWN_ROW("RSSI", "Name", "ID"),
+            rule,
+        ]
         for dev in unknown:
             rssi_str = str(dev.rssi) if dev.rssi is not None else "N/A"
-            print(f"{rssi_str:<6} {dev.name:<20} {dev.addr:<20}")
+            lines.append(_UNKNOWN_ROW(rssi_str, dev.name, dev.addr))
         if not unknown:
-            print("(none)")
-        print()
+            lines.append("(none)")
+        lines.append("")
 
-        print("-" * 80)
-        print()
+        lines += [rule, "", ""]
+        sys.stdout.write(head + "\n".join(lines))
 
 import math
 
@@ -227,7 +298,7 @@ async def main():
     scanner = BleakScanner(detection_callback=tracker.detection_callback)
 
     await scanner.start()
-    print("[INFO] Scanner started. Press Ctrl+C to stop.\n")
+    tracker.announce("[INFO] Scanner started. Press Ctrl+C to stop.", "")
 
     try:
         while True: